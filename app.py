@@ -1,18 +1,22 @@
 
 import io
 import json
-from datetime import datetime
 
 import streamlit as st
 import pandas as pd
-import requests
-import matplotlib.pyplot as plt
 
 from modules.data_handler import (
-    load_data, save_data, add_record, update_record, delete_record, merge_import,
+    load_vault, save_vault, add_record, add_records, update_record, delete_record, merge_import,
     clear_all, drop_duplicates_keep_first, reassign_ids, ensure_data_dir, make_backup,
+    bulk_delete, bulk_update, bulk_add_tag, bulk_remove_tag,
+    data_version, vault_version, split_shards, shard_path, vault_lock, parse_dates,
     CSV_PATH, CATEGORY_OPTIONS, COLUMNS, DATA_DIR
 )
+from modules.query import build_index, run_query_shards
+from modules.title_index import new_title_index, sync_title_index, title_lookup
+from modules.notes_store import load_note, hydrate_notes, is_truncated
+from modules.fetchers import fetch_books as _fetch_books, fetch_youtube as _fetch_youtube
+from modules.refresh_worker import RefreshWorker, load_topics, add_topic, remove_topic, set_interval
 
 st.set_page_config(
     page_title="KnowledgeVault",
@@ -57,6 +61,10 @@ def _ensure_state():
     # bulk ops
     ss.setdefault("bulk_selected_ids", [])
 
+    # type-ahead lookups
+    ss.setdefault("manage_lookup", "")
+    ss.setdefault("bulk_lookup", "")
+
 
 _ensure_state()
 
@@ -65,82 +73,15 @@ st.title("KnowledgeVault — Personal Knowledge Hub")
 st.caption("Add, search, auto-fetch, export/import, edit, delete, visualize, backup/restore, and bulk manage your learning resources.")
 
 
-df = load_data(CSV_PATH)
-
-
-VIDEO_CAT = "YouTube" if "YouTube" in CATEGORY_OPTIONS else ("Video" if "Video" in CATEGORY_OPTIONS else "Other")
-BOOK_CAT = "Book" if "Book" in CATEGORY_OPTIONS else "Article"
+df = load_vault(CSV_PATH)
 
 
 def fetch_books(query: str, max_results: int = 6):
-    if not query.strip():
-        return []
-    url = "https://www.googleapis.com/books/v1/volumes"
-    params = {"q": query.strip(), "maxResults": max_results}
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-    except Exception as e:
-        st.error(f"Google Books fetch failed: {e}")
-        return []
-
-    items = []
-    for item in data.get("items", []):
-        vi = item.get("volumeInfo", {})
-        title = vi.get("title", "Untitled")
-        link = vi.get("infoLink", "")
-        desc = vi.get("description", "") or ""
-        authors = ", ".join(vi.get("authors", [])) if vi.get("authors") else ""
-        notes = f"Fetched via Google Books. {('Authors: '+authors+'. ') if authors else ''}{desc[:300]}".strip()
-        items.append({
-            "title": title,
-            "link": link,
-            "tags": query,
-            "category": BOOK_CAT,
-            "notes": notes,
-            "source": "google_books",
-        })
-    return items
+    return _fetch_books(query, max_results, on_error=lambda e: st.error(f"Google Books fetch failed: {e}"))
 
 def fetch_youtube(query: str, max_results: int = 6):
     key = st.secrets.get("YOUTUBE_API_KEY", None)
-    if not key or not query.strip():
-        return []
-    url = "https://www.googleapis.com/youtube/v3/search"
-    params = {
-        "part": "snippet",
-        "q": query.strip(),
-        "maxResults": max_results,
-        "type": "video",
-        "key": key,
-        "safeSearch": "moderate"
-    }
-    try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-    except Exception as e:
-        st.error(f"YouTube fetch failed: {e}")
-        return []
-
-    items = []
-    for item in data.get("items", []):
-        snippet = item.get("snippet", {})
-        title = snippet.get("title", "Untitled")
-        video_id = (item.get("id") or {}).get("videoId", "")
-        link = f"https://www.youtube.com/watch?v={video_id}" if video_id else ""
-        desc = snippet.get("description", "") or ""
-        notes = f"Fetched via YouTube. {desc[:300]}".strip()
-        items.append({
-            "title": title,
-            "link": link,
-            "tags": query,
-            "category": VIDEO_CAT,
-            "notes": notes,
-            "source": "youtube",
-        })
-    return items
+    return _fetch_youtube(query, max_results, key=key, on_error=lambda e: st.error(f"YouTube fetch failed: {e}"))
 
 
 st.subheader("Auto-Fetch Knowledge")
@@ -210,16 +151,6 @@ with b:
     preview_btn = st.button("Preview (Don’t save)")
     st.markdown('</div>', unsafe_allow_html=True)
 
-def merge_new_records(df_in: pd.DataFrame, new_items: list[dict]) -> tuple[pd.DataFrame, int, int]:
-    df_work = df_in.copy()
-    before = len(df_work)
-    for rec in new_items:
-        df_work = add_record(df_work, rec)
-    after = len(df_work)
-    added = after - before
-    skipped = len(new_items) - added
-    return df_work, added, skipped
-
 if fetch_and_save or preview_btn:
     q = st.session_state.fetch_query.strip()
     if not q:
@@ -242,20 +173,97 @@ if fetch_and_save or preview_btn:
                 prev_df = pd.DataFrame(fetched)[["title","category","tags","link"]]
                 st.dataframe(prev_df, use_container_width=True, hide_index=True)
             if fetch_and_save:
-                new_df, added, skipped = merge_new_records(df, fetched)
-                if added > 0:
-                    save_data(new_df, CSV_PATH)
-                    df = new_df
+                with vault_lock():
+                    df = load_vault(CSV_PATH)
+                    new_df, added, skipped = add_records(df, fetched)
+                    if added > 0:
+                        save_vault(new_df, CSV_PATH, base=df)
+                        df = new_df
                 st.success(f"Saved {added} new / {skipped} duplicates for “{q}”")
 
+
+
+@st.cache_resource(show_spinner=False)
+def _refresh_worker():
+    """One background refresh worker per server process."""
+    try:
+        key = st.secrets.get("YOUTUBE_API_KEY", None)
+    except FileNotFoundError:  # no secrets.toml: books only
+        key = None
+    return RefreshWorker(CSV_PATH, youtube_key=key).start()
+
+
+with st.expander("Watched Topics (background refresh)"):
+    worker = _refresh_worker()
+    watch_cfg = load_topics()
+
+    w1, w2, w3 = st.columns([1.2, 1, 1])
+    with w1:
+        if st.button("Watch current topic", use_container_width=True):
+            if add_topic(st.session_state.fetch_query, st.session_state.fetch_count,
+                         st.session_state.fetch_books_on, st.session_state.fetch_yt_on):
+                st.success(f"Watching “{st.session_state.fetch_query.strip()}”.")
+                watch_cfg = load_topics()
+            else:
+                st.warning("Enter a topic that isn't already watched.")
+    with w2:
+        interval = st.number_input("Every (minutes)", 1, 24 * 60, int(watch_cfg["interval_minutes"]))
+        if interval != watch_cfg["interval_minutes"]:
+            set_interval(interval)
+    with w3:
+        if st.button("Refresh now", use_container_width=True):
+            worker.run_now()
+            st.info("Refresh queued.")
+
+    stats = worker.snapshot()
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Queue depth", stats["queue_depth"])
+    m2.metric("Last run latency", f"{stats['last_latency_s']:.1f} s" if stats["last_latency_s"] is not None else "—")
+    m3.metric("Added last run", stats["last_added"])
+    st.caption(f"Last run: {stats['last_run'] or 'never'}" + (" • running…" if stats["running"] else ""))
+
+    if watch_cfg["topics"]:
+        rows = []
+        for t in watch_cfg["topics"]:
+            last = stats["per_topic"].get(t["topic"], {})
+            rows.append({
+                "topic": t["topic"],
+                "per source": t.get("count", 6),
+                "fetched": last.get("fetched", "—"),
+                "added": last.get("added", "—"),
+                "duplicates": last.get("duplicates", "—"),
+                "last refresh": last.get("at", "—"),
+            })
+        st.dataframe(pd.DataFrame(rows).astype(str), use_container_width=True, hide_index=True)
+
+        u1, u2 = st.columns([2, 1])
+        with u1:
+            unwatch = st.selectbox("Stop watching", [t["topic"] for t in watch_cfg["topics"]], key="unwatch_topic")
+        with u2:
+            if st.button("Remove", use_container_width=True):
+                remove_topic(unwatch)
+                st.rerun()
+    else:
+        st.caption("No watched topics yet.")
+
+    for err in stats["errors"][-3:]:
+        st.caption(f"⚠️ {err}")
+
 st.markdown("---")
 
 
+def _reset_filters():
+    # Runs before the next rerun, so the widgets pick up the cleared values
+    st.session_state.search_term = ""
+    st.session_state.selected_category = "All"
+    st.session_state.selected_tag = "All"
+
+
 st.subheader("Search in Your table")
 a, b, c, d, e = st.columns([2, 1, 1, 1, 1.2])
 
 with a:
-    st.text_input("Search", key="search_term", placeholder="Search title/notes/tags/link")
+    st.text_input("Search", key="search_term", placeholder='e.g. category:Book tag:sql added:>2025-08 "window functions" -beginner')
 
 with b:
     categories = ["All"] + sorted(df["category"].astype(str).unique().tolist())
@@ -276,17 +284,12 @@ with c:
 with d:
     st.markdown("""
     <style>
-    .primaryBtn > button { background:#4CAF50; color:white; border:none; height:40px; border-radius:8px; font-weight:600;}
-    .primaryBtn > button:hover { filter:brightness(0.95); }
     .resetBtn > button { background:#f1f3ff; color:#2b2d42; border:none; height:40px; border-radius:8px; font-weight:600;}
     .resetBtn > button:hover { filter:brightness(0.95); }
     </style>
     """, unsafe_allow_html=True)
-    st.markdown('<div class="primaryBtn">', unsafe_allow_html=True)
-    do_search = st.button("Search")
-    st.markdown('</div>', unsafe_allow_html=True)
     st.markdown('<div class="resetBtn">', unsafe_allow_html=True)
-    reset_btn = st.button("Reset")
+    st.button("Reset", on_click=_reset_filters)
     st.markdown('</div>', unsafe_allow_html=True)
 
 
@@ -294,34 +297,37 @@ with d:
 quick_csv = st.button("Export Filtered CSV")
 
 
-filtered_df = df.copy()
-if do_search:
-    term = st.session_state.search_term.strip().lower()
-    if term:
-        mask = []
-        for _, row in filtered_df.iterrows():
-            row_text = " ".join(map(str, row.values)).lower()
-            mask.append(term in row_text)
-        filtered_df = filtered_df[pd.Series(mask).values]
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _shard_index(name, version, rows, _df: pd.DataFrame):
+    """Search indexes for one shard, rebuilt only when that shard's file changes."""
+    return build_index(_df)
 
-    cat = st.session_state.selected_category
-    if cat != "All":
-        filtered_df = filtered_df[filtered_df["category"] == cat]
 
-    tag = st.session_state.selected_tag
-    if tag != "All":
-        filtered_df = filtered_df[filtered_df["tags"].str.contains(tag, case=False, na=False)]
+# Filters apply as soon as they change; the selectboxes are folded into the query.
+query = st.session_state.search_term.strip()
+if st.session_state.selected_category != "All":
+    query += f' category:"{st.session_state.selected_category}"'
+if st.session_state.selected_tag != "All":
+    query += f' tag:"{st.session_state.selected_tag}"'
+searching = bool(query.strip())
 
-if reset_btn:
-    if "search_term" not in st.session_state:
-        st.session_state.search_term = ""
-        st.session_state.selected_category = "All"
-        st.session_state.selected_tag = "All"
-        st.rerun()
+filtered_df = df
+search_report = None
+if searching:
+    shards = split_shards(df)
+    indexes = {
+        name: _shard_index(name, data_version(shard_path(CSV_PATH, name)), len(part), part)
+        for name, part in shards.items()
+    }
+    filtered_df, search_report = run_query_shards(shards, query, indexes)
+    with st.expander(f"Query plan — {search_report['rows']} match(es) in {search_report['total_ms']:.1f} ms"):
+        if search_report["steps"]:
+            st.dataframe(pd.DataFrame(search_report["steps"]), use_container_width=True, hide_index=True)
+        st.caption(f"Plan: {search_report['plan_ms']:.2f} ms • Execute: {search_report['exec_ms']:.2f} ms")
 
 if quick_csv:
     buf = io.StringIO()
-    (filtered_df if do_search else df).to_csv(buf, index=False)
+    hydrate_notes(filtered_df, CSV_PATH).to_csv(buf, index=False)
     st.download_button(
         "Download Filtered CSV",
         buf.getvalue(),
@@ -331,6 +337,12 @@ if quick_csv:
     )
 
 
+@st.cache_resource(show_spinner=False)
+def _title_index(csv_path):
+    """One type-ahead index per vault, kept for the process and synced row by row."""
+    return new_title_index()
+
+
 with st.sidebar:
     st.subheader("Add Item")
     st.text_input("Title *", key="form_title", placeholder="e.g., Introduction to SQL")
@@ -352,11 +364,15 @@ with st.sidebar:
                 "tags": st.session_state.form_tags,
                 "source": "manual"
             }
-            new_df = add_record(df.copy(), rec)
-            if len(new_df) == len(df):
+            with vault_lock():
+                df = load_vault(CSV_PATH)
+                new_df = add_record(df.copy(), rec)
+                added = len(new_df) > len(df)
+                if added:
+                    save_vault(new_df, CSV_PATH, base=df)
+            if not added:
                 st.warning("Duplicate (title+link) — not added.")
             else:
-                save_data(new_df, CSV_PATH)
                 st.success("Added!")
                 st.rerun()
 
@@ -365,13 +381,17 @@ with st.sidebar:
     if df.empty:
         st.info("No items yet.")
     else:
-       
-        options = [(int(row.id), f"{int(row.id)} — {row.title}")for _, row in df.sort_values("id").dropna(subset=["id"]).iterrows()]
-
-        if "chosen" not in st.session_state:
+        # Only the top matches are sent to the browser, never the full list
+        title_index = sync_title_index(_title_index(CSV_PATH), df, vault_version(CSV_PATH))
+        st.text_input("Find item", key="manage_lookup", placeholder="Type a title or id…")
+        options = title_lookup(title_index, st.session_state.manage_lookup, limit=20)
+        if not options:
+            st.caption("No matches.")
+            options = [None]
+        if st.session_state.get("chosen") not in options:
             st.session_state.chosen = options[0]
-       
-        chosen = st.selectbox("Select item", options, format_func=lambda x: x[1],key="chosen")
+
+        chosen = st.selectbox("Select item", options, format_func=lambda x: x[1] if x else "—", key="chosen")
 
         chosen_id = chosen[0] if isinstance(chosen, tuple) else None
         if chosen_id is not None:
@@ -379,7 +399,7 @@ with st.sidebar:
             st.text_input("Title", value=str(row.get("title","")), key="manage_title")
             st.selectbox("Category", CATEGORY_OPTIONS, index=max(0, CATEGORY_OPTIONS.index(row["category"]) if row["category"] in CATEGORY_OPTIONS else 0), key="manage_category")
             st.text_input("Link", value=str(row.get("link","")), key="manage_link")
-            st.text_area("Notes", value=str(row.get("notes","")), key="manage_notes")
+            st.text_area("Notes", value=load_note(CSV_PATH, chosen_id, row.get("notes","")), key="manage_notes")
             st.text_input("Tags", value=str(row.get("tags","")), key="manage_tags")
 
             c1, c2 = st.columns(2)
@@ -392,49 +412,110 @@ with st.sidebar:
                         "notes": st.session_state.manage_notes,
                         "tags": st.session_state.manage_tags,
                     }
-                    new_df = update_record(df.copy(), chosen_id, updates)
-                    save_data(new_df, CSV_PATH)
+                    with vault_lock():
+                        df = load_vault(CSV_PATH)
+                        new_df = update_record(df.copy(), chosen_id, updates)
+                        save_vault(new_df, CSV_PATH, base=df)
                     st.success("Updated.")
                     st.rerun()
             with c2:
                 if st.button(" Delete", use_container_width=True):
-                    new_df = delete_record(df.copy(), chosen_id)
-                    save_data(new_df, CSV_PATH)
+                    with vault_lock():
+                        df = load_vault(CSV_PATH)
+                        new_df = delete_record(df.copy(), chosen_id)
+                        save_vault(new_df, CSV_PATH, base=df)
                     st.success("Deleted.")
                     st.rerun()
 
     st.divider()
     st.subheader(" Bulk Operations")
     if not df.empty:
-        # Multiselect IDs for bulk ops
-        bulk_options = [(int(row.id), f"{int(row.id)} — {row.title}") for _, row in df.sort_values("id").dropna(subset=["id"]).iterrows()]
+        # Multiselect IDs for bulk ops: current selection plus the top matches
+        title_index = sync_title_index(_title_index(CSV_PATH), df, vault_version(CSV_PATH))
+        selected = [pair for pair in st.session_state.bulk_selected_ids if pair[0] in title_index["labels"]]
+        st.session_state.bulk_selected_ids = selected
+        st.text_input("Find items", key="bulk_lookup", placeholder="Type a title or id…")
+        matches = title_lookup(title_index, st.session_state.bulk_lookup, limit=20)
+        bulk_options = selected + [pair for pair in matches if pair not in selected]
 
         st.multiselect("Select IDs for bulk actions", bulk_options, key="bulk_selected_ids", format_func=lambda x: x[1])
+        bulk_scope = st.radio("Apply bulk actions to", ["Selected IDs", "All in category"], key="bulk_scope", horizontal=True)
+        if bulk_scope == "All in category":
+            bulk_cat = st.selectbox("Category", CATEGORY_OPTIONS, key="bulk_category")
+            bulk_target = {"where": lambda d: d["category"] == bulk_cat}
+        else:
+            bulk_target = {"ids": [pair[0] for pair in st.session_state.bulk_selected_ids]}
+        has_target = bulk_scope != "Selected IDs" or bool(bulk_target["ids"])
+
         b1, b2 = st.columns(2)
         with b1:
             if st.button(" Bulk Delete", use_container_width=True, type="secondary"):
-                ids_to_delete = [pair[0] for pair in st.session_state.bulk_selected_ids]
-                if ids_to_delete:
-                    new_df = df[~df["id"].isin(ids_to_delete)].copy()
-                    save_data(new_df, CSV_PATH)
-                    st.success(f"Deleted {len(ids_to_delete)} items.")
+                if has_target:
+                    with vault_lock():
+                        df = load_vault(CSV_PATH)
+                        new_df, removed = bulk_delete(df, **bulk_target)
+                        if removed > 0:
+                            save_vault(new_df, CSV_PATH, base=df)
+                    st.success(f"Deleted {removed} items.")
                     st.rerun()
                 else:
                     st.warning("No IDs selected.")
         with b2:
             if st.button("🪄 Remove Duplicates", use_container_width=True):
-                new_df, removed = drop_duplicates_keep_first(df.copy())
+                with vault_lock():
+                    df = load_vault(CSV_PATH)
+                    new_df, removed = drop_duplicates_keep_first(df.copy())
+                    if removed > 0:
+                        save_vault(new_df, CSV_PATH, base=df)
                 if removed > 0:
-                    save_data(new_df, CSV_PATH)
                     st.success(f"Removed {removed} duplicate(s).")
                     st.rerun()
                 else:
                     st.info("No duplicates found.")
 
+        # Bulk edit (one write per action)
+        st.selectbox("Set category to", CATEGORY_OPTIONS, key="bulk_new_category")
+        if st.button(" Bulk Set Category", use_container_width=True):
+            if has_target:
+                with vault_lock():
+                    df = load_vault(CSV_PATH)
+                    new_df, changed = bulk_update(df, {"category": st.session_state.bulk_new_category}, **bulk_target)
+                    if changed > 0:
+                        save_vault(new_df, CSV_PATH, base=df)
+                st.success(f"Updated {changed} items.")
+                st.rerun()
+            else:
+                st.warning("No IDs selected.")
+
+        st.text_input("Tag", key="bulk_tag", placeholder="e.g., beginner")
+        t1, t2 = st.columns(2)
+        with t1:
+            add_tag_btn = st.button(" Add Tag", use_container_width=True)
+        with t2:
+            remove_tag_btn = st.button(" Remove Tag", use_container_width=True)
+        if add_tag_btn or remove_tag_btn:
+            tag = st.session_state.bulk_tag.strip()
+            if not tag:
+                st.warning("Enter a tag.")
+            elif not has_target:
+                st.warning("No IDs selected.")
+            else:
+                op = bulk_add_tag if add_tag_btn else bulk_remove_tag
+                with vault_lock():
+                    df = load_vault(CSV_PATH)
+                    new_df, changed = op(df, tag, **bulk_target)
+                    if changed > 0:
+                        save_vault(new_df, CSV_PATH, base=df)
+                st.success(f"Retagged {changed} items.")
+                st.rerun()
+
         # Reassign IDs (compact)
         if st.button(" Reassign IDs (1..N)", use_container_width=True):
-            new_df = reassign_ids(df.copy())
-            save_data(new_df, CSV_PATH)
+            # Notes are keyed by id, so renumber with full notes in hand
+            with vault_lock():
+                df = load_vault(CSV_PATH)
+                new_df = reassign_ids(hydrate_notes(df, CSV_PATH))
+                save_vault(new_df, CSV_PATH, base=df)
             st.success("IDs reassigned.")
             st.rerun()
 
@@ -442,32 +523,38 @@ with st.sidebar:
         st.markdown("—")
         confirm_clear = st.checkbox("I understand this will permanently delete all records.")
         if st.button(" Clear All", use_container_width=True, disabled=not confirm_clear):
-            new_df = clear_all()
-            save_data(new_df, CSV_PATH)
+            with vault_lock():
+                df = load_vault(CSV_PATH)
+                new_df = clear_all()
+                save_vault(new_df, CSV_PATH, base=df)
             st.success("All records cleared.")
             st.rerun()
 
     st.divider()
     st.subheader(" Export")
     
-    csv_buf = io.StringIO()
-    df.to_csv(csv_buf, index=False)
-    st.download_button("Download CSV (All)", csv_buf.getvalue(), file_name="knowledge_data.csv", mime="text/csv", use_container_width=True)
+    # Full exports need the notes side store, so build them on demand
+    if st.button("Prepare Export (All)", use_container_width=True):
+        full_df = hydrate_notes(df, CSV_PATH)
+
+        csv_buf = io.StringIO()
+        full_df.to_csv(csv_buf, index=False)
+        st.download_button("Download CSV (All)", csv_buf.getvalue(), file_name="knowledge_data.csv", mime="text/csv", use_container_width=True)
 
-    json_buf = io.StringIO()
-    df.to_json(json_buf, orient="records", indent=2, force_ascii=False)
-    st.download_button("Download JSON (All)", json_buf.getvalue(), file_name="knowledge_data.json", mime="application/json", use_container_width=True)
+        json_buf = io.StringIO()
+        full_df.to_json(json_buf, orient="records", indent=2, force_ascii=False)
+        st.download_button("Download JSON (All)", json_buf.getvalue(), file_name="knowledge_data.json", mime="application/json", use_container_width=True)
 
-    # Excel export
-    xlsx_bytes = io.BytesIO()
-    with pd.ExcelWriter(xlsx_bytes, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Knowledge")
-    st.download_button("Download Excel (All)", xlsx_bytes.getvalue(), file_name="knowledge_data.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+        # xlsxwriter is only loaded here
+        xlsx_bytes = io.BytesIO()
+        with pd.ExcelWriter(xlsx_bytes, engine="xlsxwriter") as writer:
+            full_df.to_excel(writer, index=False, sheet_name="Knowledge")
+        st.download_button("Download Excel (All)", xlsx_bytes.getvalue(), file_name="knowledge_data.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
 
     # Export selected IDs (if any)
     if st.session_state.bulk_selected_ids:
         sel_ids = [pair[0] for pair in st.session_state.bulk_selected_ids]
-        sel_df = df[df["id"].isin(sel_ids)].copy()
+        sel_df = hydrate_notes(df[df["id"].isin(sel_ids)], CSV_PATH)
         sel_csv = io.StringIO()
         sel_df.to_csv(sel_csv, index=False)
         st.download_button("Download CSV (Selected IDs)", sel_csv.getvalue(), file_name="knowledge_selected.csv", mime="text/csv", use_container_width=True)
@@ -488,9 +575,11 @@ with st.sidebar:
             else:
                 inc = pd.read_csv(uploaded)
 
-            new_df, added, skipped = merge_import(df.copy(), inc)
-            if added > 0:
-                save_data(new_df, CSV_PATH)
+            with vault_lock():
+                df = load_vault(CSV_PATH)
+                new_df, added, skipped = merge_import(df.copy(), inc)
+                if added > 0:
+                    save_vault(new_df, CSV_PATH, base=df)
             st.success(f"Imported: added {added}, skipped {skipped} duplicates.")
             st.button("Refresh data", on_click=st.experimental_rerun, use_container_width=True)
         except Exception as e:
@@ -511,8 +600,9 @@ with st.sidebar:
             else:
                 restored = pd.read_csv(restore_file)
 
-            # Ensure schema and save
-            save_data(restored, CSV_PATH)
+            # Ensure schema and save (replaces the vault, so nothing to reload)
+            with vault_lock():
+                save_vault(restored, CSV_PATH)
             st.success("Restore complete.")
             st.button("Reload", on_click=st.experimental_rerun, use_container_width=True)
         except Exception as e:
@@ -529,12 +619,26 @@ with st.sidebar:
     )
 
 
-tab_table, tab_cards, tab_analytics = st.tabs(["Table View", "Card View", "Analytics"])
+# Only the active view is rendered on each rerun (st.tabs would build all three).
+active_tab = st.radio("View", ["Table View", "Card View", "Analytics"], key="active_tab", horizontal=True, label_visibility="collapsed")
+
 
+@st.cache_data(show_spinner=False)
+def _analytics_data(version, _df: pd.DataFrame):
+    """Chart inputs, cached per data version (the frame itself is not hashed)."""
+    dates = parse_dates(_df["date_added"])
+    by_cat = _df["category"].astype(str).value_counts().rename_axis("category").reset_index(name="items")
+    months = dates.dt.to_period("M").dropna().value_counts().sort_index()
+    by_month = pd.DataFrame({
+        "month": [p.to_timestamp().strftime("%b %Y") for p in months.index],
+        "items": months.values,
+    })
+    return by_cat, by_month
 
-with tab_table:
+
+if active_tab == "Table View":
     st.subheader("Table View")
-    target_df = filtered_df if do_search else df
+    target_df = filtered_df
     if target_df.empty:
         st.info("No items to display.")
     else:
@@ -569,9 +673,9 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-with tab_cards:
+if active_tab == "Card View":
     st.subheader("Card View")
-    target_df = filtered_df if do_search else df
+    target_df = filtered_df
     if target_df.empty:
         st.info("No items to display.")
     else:
@@ -595,43 +699,39 @@ with tab_cards:
                 """,
                 unsafe_allow_html=True
             )
+            # Full notes are loaded from the side store only when asked for
+            if is_truncated(notes) and st.checkbox("Show full notes", key=f"full_notes_{row.get('id')}"):
+                st.write(load_note(CSV_PATH, row.get("id"), notes))
 
 
-with tab_analytics:
+if active_tab == "Analytics":
     st.subheader("Analytics")
     if df.empty:
         st.info("No data to chart yet.")
     else:
-        work = df.copy()
-        work["date_added"] = pd.to_datetime(work["date_added"], errors="coerce")
-        work["month"] = work["date_added"].dt.to_period("M").astype(str)
+        by_cat, by_month = _analytics_data(vault_version(CSV_PATH), df)
 
         c1, c2 = st.columns(2)
 
         with c1:
             st.markdown("**Items by Category**")
-            counts = work["category"].astype(str).value_counts()
-            fig1, ax1 = plt.subplots()
-            ax1.pie(counts.values, labels=counts.index, autopct="%1.0f%%", startangle=90)
-            ax1.axis("equal")
-            st.pyplot(fig1, use_container_width=True)
+            st.vega_lite_chart(by_cat, {
+                "mark": {"type": "arc", "tooltip": True},
+                "encoding": {
+                    "theta": {"field": "items", "type": "quantitative"},
+                    "color": {"field": "category", "type": "nominal"},
+                },
+            }, use_container_width=True)
 
         with c2:
             st.markdown("**Items per Month**")
-            month_counts = work["month"].value_counts().sort_index()
-            pretty_index = []
-            for m in month_counts.index:
-                try:
-                    dt = datetime.strptime(m, "%Y-%m")
-                    pretty_index.append(dt.strftime("%b %Y"))
-                except Exception:
-                    pretty_index.append(m)
-            fig2, ax2 = plt.subplots()
-            ax2.bar(pretty_index, month_counts.values)
-            ax2.tick_params(axis="x", rotation=45)
-            ax2.set_ylabel("Items")
-            st.pyplot(fig2, use_container_width=True)
-
+            st.vega_lite_chart(by_month, {
+                "mark": {"type": "bar", "tooltip": True},
+                "encoding": {
+                    "x": {"field": "month", "type": "ordinal", "sort": None, "axis": {"labelAngle": -45}},
+                    "y": {"field": "items", "type": "quantitative", "title": "Items"},
+                },
+            }, use_container_width=True)
 
 st.markdown("---")
 st.caption("Complete build: Auto-Fetch • Filters • Export/Import • CRUD • Analytics • Bulk Ops • Backup/Restore")
@@ -1,8 +1,15 @@
 # modules/data_handler.py
+import glob
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 import pandas as pd
 
+from modules.notes_store import plan_notes, commit_notes, hydrate_notes, preview_notes
+
 
 DATA_DIR = "data"
 CSV_PATH = os.path.join(DATA_DIR, "knowledge_data.csv")
@@ -21,6 +28,20 @@ CATEGORY_OPTIONS = [
 COLUMNS = ["id", "title", "category", "link", "notes", "tags", "source", "date_added"]
 
 
+# Storage layout: "" keeps everything in CSV_PATH; "category" or "hash" splits the
+# vault into shard files next to it (e.g. data/knowledge_data.book.csv).
+SHARD_MODES = ("", "category", "hash")
+SHARD_BY = os.environ.get("KNOWLEDGEVAULT_SHARD_BY", "").strip().lower()
+if SHARD_BY not in SHARD_MODES:
+    print(f"⚠️ Unknown KNOWLEDGEVAULT_SHARD_BY={SHARD_BY!r} (expected 'category' or 'hash'); using the single file.")
+    SHARD_BY = ""
+_n_shards = os.environ.get("KNOWLEDGEVAULT_SHARDS", "8").strip()
+N_SHARDS = int(_n_shards) if _n_shards.isdigit() else 0
+if N_SHARDS < 1:
+    print(f"⚠️ Invalid KNOWLEDGEVAULT_SHARDS={_n_shards!r} (expected a positive integer); using 8.")
+    N_SHARDS = 8
+
+
 def ensure_data_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -33,6 +54,12 @@ def _ensure_schema(df: pd.DataFrame) -> pd.DataFrame:
     df["id"] = pd.to_numeric(df["id"], errors="coerce")
     return df
 
+def parse_dates(series: pd.Series) -> pd.Series:
+    """Parse date_added, which holds both ISO timestamps (add_record) and legacy '%d-%m-%Y %H:%M'."""
+    iso = pd.to_datetime(series, errors="coerce", format="%Y-%m-%d %H:%M:%S")
+    legacy = pd.to_datetime(series, errors="coerce", format="%d-%m-%Y %H:%M")
+    return iso.fillna(legacy)
+
 
 def load_data(csv_path: str) -> pd.DataFrame:
     """Load the CSV into a DataFrame, ensuring correct columns."""
@@ -43,17 +70,175 @@ def load_data(csv_path: str) -> pd.DataFrame:
     df = _ensure_schema(df)
     return df
 
-def save_data(df, csv_path):
-    temp_path = csv_path + ".tmp"
+def data_version(csv_path: str) -> tuple:
+    """Cheap cache key for the on-disk vault (mtime + size); changes on every save."""
+    try:
+        st = os.stat(csv_path)
+    except FileNotFoundError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
 
-    
+def _write_csv(df: pd.DataFrame, csv_path: str) -> bool:
+    """Atomically replace csv_path; returns False if the file could not be replaced."""
+    temp_path = csv_path + ".tmp"
     df.to_csv(temp_path, index=False)
-
-   
     try:
         os.replace(temp_path, csv_path)  # works on Windows & Linux
     except PermissionError:
         print(f"⚠️ Could not replace {csv_path}. Maybe it's open in Excel?")
+        return False
+    return True
+
+def save_data(df, csv_path) -> bool:
+    # Long notes go to the compressed side store; the CSV keeps previews.
+    # The store is only updated once the CSV holding the new previews is in place.
+    df, upserts, keep = plan_notes(df, csv_path)
+    if not _write_csv(df, csv_path):
+        return False
+    commit_notes(csv_path, upserts, keep)
+    return True
+
+
+# -------------- Sharded storage --------------
+def _slug(value) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "_", str(value).strip().lower()).strip("_")
+    return slug or "uncategorized"
+
+# Every shard name a layout can produce; other files next to the vault are ignored
+CATEGORY_SHARDS = {_slug(c) for c in CATEGORY_OPTIONS} | {"uncategorized"}
+_HASH_SHARD_RE = re.compile(r"h\d{2,}")
+
+def _is_shard_name(name: str) -> bool:
+    return name in CATEGORY_SHARDS or bool(_HASH_SHARD_RE.fullmatch(name))
+
+def shard_keys(df: pd.DataFrame, shard_by: str = None) -> pd.Series:
+    """
+    Shard name for every row under the given (default: configured) layout.
+    Categories outside CATEGORY_OPTIONS share the "uncategorized" shard.
+    """
+    shard_by = SHARD_BY if shard_by is None else shard_by
+    if shard_by == "category":
+        cats = df["category"].fillna("").astype(str)
+        return cats.map({c: _slug(c) if c in CATEGORY_OPTIONS else "uncategorized" for c in cats.unique()})
+    if shard_by == "hash":
+        ids = pd.to_numeric(df["id"], errors="coerce").fillna(0).astype("int64")
+        return (ids % N_SHARDS).map(lambda h: f"h{h:02d}")
+    return pd.Series("", index=df.index)
+
+def shard_path(csv_path: str, name: str) -> str:
+    """data/knowledge_data.csv + 'book' -> data/knowledge_data.book.csv ('' is the single file)."""
+    if not name:
+        return csv_path
+    root, ext = os.path.splitext(csv_path)
+    return f"{root}.{name}{ext}"
+
+def _shard_files(csv_path: str) -> dict:
+    root, ext = os.path.splitext(csv_path)
+    files = {}
+    for path in sorted(glob.glob(f"{glob.escape(root)}.*{ext}")):
+        name = path[len(root) + 1:-len(ext)]
+        if _is_shard_name(name):
+            files[name] = path
+    return files
+
+def split_shards(df: pd.DataFrame, shard_by: str = None) -> dict:
+    """Split a vault frame into {shard name: frame} under the given layout."""
+    keys = shard_keys(df, shard_by)
+    if df.empty:
+        return {"": df} if not (SHARD_BY if shard_by is None else shard_by) else {}
+    return {name: part for name, part in df.groupby(keys.values, sort=True)}
+
+def load_shards(csv_path: str = CSV_PATH, workers: int = None) -> dict:
+    """
+    Load every shard file of the vault in parallel. The single file (if present)
+    is returned under the name "", so the unsharded layout is just one shard.
+    """
+    paths = _shard_files(csv_path)
+    if os.path.exists(csv_path) or not paths:
+        paths = {"": csv_path, **paths}
+    if len(paths) == 1:
+        return {name: load_data(path) for name, path in paths.items()}
+    # read_csv releases the GIL while parsing, so threads are enough here
+    with ThreadPoolExecutor(max_workers=workers or min(8, len(paths))) as pool:
+        frames = list(pool.map(load_data, paths.values()))
+    return dict(zip(paths, frames))
+
+def load_vault(csv_path: str = CSV_PATH) -> pd.DataFrame:
+    """Load the whole vault (single file or all shards) as one DataFrame."""
+    shards = load_shards(csv_path)
+    frames = [f for f in shards.values() if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    if len(frames) == 1:
+        return frames[0]
+    return _ensure_schema(pd.concat(frames, ignore_index=True))
+
+def vault_version(csv_path: str = CSV_PATH) -> tuple:
+    """Cache key covering the single file and every shard file."""
+    paths = [csv_path, *_shard_files(csv_path).values()]
+    return tuple((p, data_version(p)) for p in paths)
+
+# One writer at a time: the app and the refresh worker share this process
+VAULT_LOCK = threading.RLock()
+
+@contextmanager
+def vault_lock():
+    """
+    Hold around a whole load -> change -> save_vault cycle, and load inside it,
+    so a concurrent writer's rows are not overwritten by a stale frame.
+    """
+    with VAULT_LOCK:
+        yield
+
+def save_vault(df: pd.DataFrame, csv_path: str = CSV_PATH, base: pd.DataFrame = None):
+    """
+    Persist the vault under the configured layout. With sharding on, only shards
+    whose rows differ from `base` (the frame the change was made from) are
+    rewritten; without `base` every shard is written. Switching layouts migrates
+    on the next save.
+    """
+    if not SHARD_BY:
+        # Old shards are only dropped once the single file holding their rows is in place
+        if save_data(df, csv_path):
+            for path in _shard_files(csv_path).values():
+                os.remove(path)
+        return
+
+    # One notes store for the whole vault, so rows can move between shards
+    df, upserts, keep = plan_notes(_ensure_schema(df), csv_path)
+    new = split_shards(df)
+    old = split_shards(preview_notes(_ensure_schema(base))) if base is not None else {}
+    existing = _shard_files(csv_path)
+    migrating = os.path.exists(csv_path)
+
+    failed, written = set(), set()
+    for name, part in new.items():
+        path = shard_path(csv_path, name)
+        # Compare values only: edited columns may be object while untouched ones are str
+        unchanged = name in old and name in existing and (
+            old[name].reset_index(drop=True).astype(object).equals(part.reset_index(drop=True).astype(object))
+        )
+        if migrating or not unchanged:
+            if _write_csv(part, path):
+                written.add(os.path.abspath(path))
+            else:
+                failed.add(name)
+
+    # Drop files that no longer hold any rows, but never one written above,
+    # and nothing at all if a shard failed to write (its rows may live there)
+    if not failed:
+        stale = [path for name, path in existing.items() if name not in new]
+        if migrating:
+            stale.append(csv_path)
+        for path in stale:
+            if os.path.abspath(path) not in written:
+                os.remove(path)
+
+    # Only store bodies whose previews reached disk; prune only after a clean save
+    if failed:
+        failed_ids = {int(i) for name in failed for i in new[name]["id"].dropna()}
+        upserts = {rid: v for rid, v in upserts.items() if rid not in failed_ids}
+    commit_notes(csv_path, upserts, None if failed else keep)
 
 
 def generate_id(df: pd.DataFrame) -> int:
@@ -95,6 +280,44 @@ def add_record(df: pd.DataFrame, record: dict) -> pd.DataFrame:
     df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
     return _ensure_schema(df)
 
+def _dedupe_keys(df: pd.DataFrame) -> pd.Series:
+    title = df["title"].fillna("").astype(str).str.strip().str.lower()
+    link = df["link"].fillna("").astype(str).str.strip().str.lower()
+    return title + "\x1f" + link
+
+def add_records(df: pd.DataFrame, records: list[dict]) -> tuple[pd.DataFrame, int, int]:
+    """
+    Batch version of add_record(): dedupe all records against the vault and each
+    other (title+link) in one pass and append the new ones with consecutive ids.
+    Returns (new_df, added_count, skipped_count).
+    """
+    df = _ensure_schema(df)
+    if not records:
+        return df, 0, 0
+    new = pd.DataFrame(records)
+    for col, default in (("title", ""), ("link", ""), ("notes", ""), ("tags", ""),
+                         ("category", "Other"), ("source", "manual")):
+        if col not in new.columns:
+            new[col] = default
+        new[col] = new[col].fillna(default)
+    for col in ("title", "link", "notes", "tags"):
+        new[col] = new[col].astype(str).str.strip()
+
+    keys = _dedupe_keys(new)
+    fresh = ~keys.isin(set(_dedupe_keys(df))) & ~keys.duplicated()
+    new = new[fresh]
+    added = len(new)
+    if added == 0:
+        return df, 0, len(records)
+
+    start = generate_id(df)
+    new = new.assign(
+        id=range(start, start + added),
+        date_added=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    df = pd.concat([df, _ensure_schema(new)], ignore_index=True)
+    return _ensure_schema(df), added, len(records) - added
+
 def update_record(df: pd.DataFrame, record_id: int, updates: dict) -> pd.DataFrame:
     """Update a record by id with provided fields in `updates`."""
     df = _ensure_schema(df)
@@ -103,6 +326,7 @@ def update_record(df: pd.DataFrame, record_id: int, updates: dict) -> pd.DataFra
     mask = df["id"] == record_id
     if not mask.any():
         return df
+    df = _as_text(df, [k for k in updates if k in df.columns])
     for k, v in updates.items():
         if k in df.columns:
             df.loc[mask, k] = v
@@ -152,6 +376,97 @@ def drop_duplicates_keep_first(df: pd.DataFrame) -> tuple[pd.DataFrame, int]:
     removed = before - after
     return _ensure_schema(df), removed
 
+def _select_mask(df: pd.DataFrame, ids=None, where=None) -> pd.Series:
+    """
+    Boolean row mask for bulk ops: rows whose id is in `ids` and/or that
+    satisfy `where` (a callable taking the DataFrame and returning a mask).
+    """
+    mask = pd.Series(True, index=df.index)
+    if ids is None and where is None:
+        return ~mask
+    if ids is not None:
+        ids = pd.to_numeric(pd.Series(list(ids), dtype=object), errors="coerce").dropna()
+        mask &= df["id"].isin(ids)
+    if where is not None:
+        mask &= pd.Series(where(df), index=df.index).fillna(False).astype(bool)
+    return mask
+
+def _as_text(df: pd.DataFrame, cols) -> pd.DataFrame:
+    """Cast columns to object so string assignment works even if read_csv typed them float (all blank)."""
+    for col in cols:
+        if col != "id" and df[col].dtype != object:
+            df[col] = df[col].astype(object)
+    return df
+
+def bulk_delete(df: pd.DataFrame, ids=None, where=None) -> tuple[pd.DataFrame, int]:
+    """Delete all rows matching ids/predicate in one pass. Returns (new_df, deleted_count)."""
+    df = _ensure_schema(df)
+    if df.empty:
+        return df, 0
+    mask = _select_mask(df, ids, where)
+    removed = int(mask.sum())
+    if removed == 0:
+        return df, 0
+    return _ensure_schema(df[~mask].copy()), removed
+
+def bulk_update(df: pd.DataFrame, updates: dict, ids=None, where=None) -> tuple[pd.DataFrame, int]:
+    """Set the given fields on all matching rows in one pass. Returns (new_df, updated_count)."""
+    df = _ensure_schema(df)
+    updates = {k: v for k, v in (updates or {}).items() if k in df.columns and k != "id"}
+    if df.empty or not updates:
+        return df, 0
+    mask = _select_mask(df, ids, where)
+    changed = int(mask.sum())
+    if changed == 0:
+        return df, 0
+    df = _as_text(df.copy(), updates)
+    for k, v in updates.items():
+        df.loc[mask, k] = v
+    return _ensure_schema(df), changed
+
+def _tag_pattern(tag: str) -> str:
+    return r"(?:^|,)\s*" + re.escape(tag) + r"\s*(?=,|$)"
+
+def bulk_add_tag(df: pd.DataFrame, tag: str, ids=None, where=None) -> tuple[pd.DataFrame, int]:
+    """Append `tag` to matching rows that don't already have it. Returns (new_df, changed_count)."""
+    df = _ensure_schema(df)
+    tag = (tag or "").strip()
+    if df.empty or not tag:
+        return df, 0
+    tags = df["tags"].fillna("").astype(str).str.strip().str.strip(",").str.strip()
+    has_tag = tags.str.contains(_tag_pattern(tag), case=False, regex=True)
+    mask = _select_mask(df, ids, where) & ~has_tag
+    changed = int(mask.sum())
+    if changed == 0:
+        return df, 0
+    df = _as_text(df.copy(), ["tags"])
+    df.loc[mask, "tags"] = tags[mask].where(tags[mask] == "", tags[mask] + ", ") + tag
+    return _ensure_schema(df), changed
+
+def bulk_remove_tag(df: pd.DataFrame, tag: str, ids=None, where=None) -> tuple[pd.DataFrame, int]:
+    """Remove `tag` (case-insensitive) from matching rows. Returns (new_df, changed_count)."""
+    df = _ensure_schema(df)
+    tag = (tag or "").strip()
+    if df.empty or not tag:
+        return df, 0
+    tags = df["tags"].fillna("").astype(str)
+    pattern = _tag_pattern(tag)
+    mask = _select_mask(df, ids, where) & tags.str.contains(pattern, case=False, regex=True)
+    changed = int(mask.sum())
+    if changed == 0:
+        return df, 0
+    df = _as_text(df.copy(), ["tags"])
+    cleaned = (
+        tags[mask]
+        .str.replace(pattern, "", case=False, regex=True)
+        .str.replace(r"\s*,\s*", ", ", regex=True)
+        .str.strip()
+        .str.strip(",")
+        .str.strip()
+    )
+    df.loc[mask, "tags"] = cleaned
+    return _ensure_schema(df), changed
+
 def reassign_ids(df: pd.DataFrame) -> pd.DataFrame:
     """Reassign IDs to 1..N keeping current order by date_added then id."""
     df = _ensure_schema(df)
@@ -166,10 +481,10 @@ def clear_all() -> pd.DataFrame:
     """Return an empty DataFrame with schema (for clearing all)."""
     return pd.DataFrame(columns=COLUMNS)
 
-def make_backup(df: pd.DataFrame) -> str:
-    """Save a timestamped backup CSV in data/ and return its path."""
+def make_backup(df: pd.DataFrame, csv_path: str = CSV_PATH) -> str:
+    """Save a timestamped backup CSV (with full notes) in data/ and return its path."""
     ensure_data_dir()
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     path = os.path.join(DATA_DIR, f"knowledge_backup_{ts}.csv")
-    _ensure_schema(df).to_csv(path, index=False)
+    _ensure_schema(hydrate_notes(df, csv_path)).to_csv(path, index=False)
     return path
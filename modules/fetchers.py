@@ -0,0 +1,82 @@
+# modules/fetchers.py
+from modules.data_handler import CATEGORY_OPTIONS
+
+
+VIDEO_CAT = "YouTube" if "YouTube" in CATEGORY_OPTIONS else ("Video" if "Video" in CATEGORY_OPTIONS else "Other")
+BOOK_CAT = "Book" if "Book" in CATEGORY_OPTIONS else "Article"
+
+
+def fetch_books(query: str, max_results: int = 6, on_error=None):
+    """Google Books search -> list of record dicts. Errors go to `on_error(exc)`."""
+    if not query.strip():
+        return []
+    import requests  # lazy: only needed when fetching
+    url = "https://www.googleapis.com/books/v1/volumes"
+    params = {"q": query.strip(), "maxResults": max_results}
+    try:
+        r = requests.get(url, params=params, timeout=10)
+        r.raise_for_status()
+        data = r.json()
+    except Exception as e:
+        if on_error:
+            on_error(e)
+        return []
+
+    items = []
+    for item in data.get("items", []):
+        vi = item.get("volumeInfo", {})
+        title = vi.get("title", "Untitled")
+        link = vi.get("infoLink", "")
+        desc = vi.get("description", "") or ""
+        authors = ", ".join(vi.get("authors", [])) if vi.get("authors") else ""
+        notes = f"Fetched via Google Books. {('Authors: '+authors+'. ') if authors else ''}{desc[:300]}".strip()
+        items.append({
+            "title": title,
+            "link": link,
+            "tags": query,
+            "category": BOOK_CAT,
+            "notes": notes,
+            "source": "google_books",
+        })
+    return items
+
+def fetch_youtube(query: str, max_results: int = 6, key: str = None, on_error=None):
+    """YouTube Data API search (needs an API key) -> list of record dicts."""
+    if not key or not query.strip():
+        return []
+    import requests  # lazy: only needed when fetching
+    url = "https://www.googleapis.com/youtube/v3/search"
+    params = {
+        "part": "snippet",
+        "q": query.strip(),
+        "maxResults": max_results,
+        "type": "video",
+        "key": key,
+        "safeSearch": "moderate"
+    }
+    try:
+        r = requests.get(url, params=params, timeout=10)
+        r.raise_for_status()
+        data = r.json()
+    except Exception as e:
+        if on_error:
+            on_error(e)
+        return []
+
+    items = []
+    for item in data.get("items", []):
+        snippet = item.get("snippet", {})
+        title = snippet.get("title", "Untitled")
+        video_id = (item.get("id") or {}).get("videoId", "")
+        link = f"https://www.youtube.com/watch?v={video_id}" if video_id else ""
+        desc = snippet.get("description", "") or ""
+        notes = f"Fetched via YouTube. {desc[:300]}".strip()
+        items.append({
+            "title": title,
+            "link": link,
+            "tags": query,
+            "category": VIDEO_CAT,
+            "notes": notes,
+            "source": "youtube",
+        })
+    return items
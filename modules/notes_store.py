@@ -0,0 +1,148 @@
+# modules/notes_store.py
+import os
+import sqlite3
+import zlib
+
+import pandas as pd
+
+
+# Notes longer than this live in the side store; the CSV keeps a preview.
+PREVIEW_LEN = 160
+ELLIPSIS = "…"
+
+_CHUNK = 500  # ids per IN (...) query, below SQLite's variable limit
+
+
+def store_path(csv_path: str) -> str:
+    """Side store for a vault CSV, e.g. data/knowledge_data.csv -> data/knowledge_data_notes.db"""
+    return os.path.splitext(csv_path)[0] + "_notes.db"
+
+def make_preview(text: str) -> str:
+    text = "" if text is None or pd.isna(text) else str(text)
+    if len(text) <= PREVIEW_LEN:
+        return text
+    return text[:PREVIEW_LEN].rstrip() + ELLIPSIS
+
+def is_truncated(preview: str) -> bool:
+    preview = "" if preview is None or pd.isna(preview) else str(preview)
+    return preview.endswith(ELLIPSIS) and len(preview) > PREVIEW_LEN // 2
+
+def _connect(csv_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(store_path(csv_path))
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS notes ("
+        "id INTEGER PRIMARY KEY, preview TEXT NOT NULL, body BLOB NOT NULL)"
+    )
+    return conn
+
+def _chunks(ids: list):
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i:i + _CHUNK]
+
+
+def load_notes(csv_path: str, ids=None) -> dict:
+    """Return {id: full notes} for the given ids (all stored notes if ids is None)."""
+    if not os.path.exists(store_path(csv_path)):
+        return {}
+    out = {}
+    with _connect(csv_path) as conn:
+        if ids is None:
+            rows = conn.execute("SELECT id, body FROM notes").fetchall()
+        else:
+            keys = [int(i) for i in pd.to_numeric(pd.Series(list(ids), dtype=object), errors="coerce").dropna()]
+            rows = []
+            for chunk in _chunks(keys):
+                marks = ",".join("?" * len(chunk))
+                rows += conn.execute(f"SELECT id, body FROM notes WHERE id IN ({marks})", chunk).fetchall()
+    conn.close()
+    for rid, body in rows:
+        out[rid] = zlib.decompress(body).decode("utf-8")
+    return out
+
+def load_note(csv_path: str, record_id: int, preview: str = "") -> str:
+    """Full notes for one record, falling back to the inline preview."""
+    if not is_truncated(preview):
+        return "" if preview is None or pd.isna(preview) else str(preview)
+    return load_notes(csv_path, [record_id]).get(int(record_id), str(preview))
+
+def hydrate_notes(df: pd.DataFrame, csv_path: str) -> pd.DataFrame:
+    """Copy of df with inline previews replaced by the full stored notes (for exports/backups)."""
+    if df.empty:
+        return df.copy()
+    truncated = df["notes"].map(is_truncated)
+    if not truncated.any():
+        return df.copy()
+    bodies = load_notes(csv_path, df.loc[truncated, "id"].tolist())
+    df = df.copy()
+    full = pd.to_numeric(df.loc[truncated, "id"], errors="coerce").map(
+        lambda i: bodies.get(int(i)) if pd.notna(i) else None
+    )
+    df.loc[truncated, "notes"] = full.fillna(df.loc[truncated, "notes"])
+    return df
+
+def preview_notes(df: pd.DataFrame) -> pd.DataFrame:
+    """df with full notes replaced by their previews, without touching the store."""
+    notes = df["notes"].fillna("").astype(str)
+    full = (notes.str.len() > PREVIEW_LEN) & ~notes.map(is_truncated)
+    if not full.any():
+        return df
+    df = df.copy()
+    df.loc[full, "notes"] = notes[full].map(make_preview)
+    return df
+
+def plan_notes(df: pd.DataFrame, csv_path: str) -> tuple[pd.DataFrame, dict, set]:
+    """
+    Work out how to move long notes out of `df` without touching the store.
+    Returns (copy of df with previews inline, {id: (preview, compressed body)}
+    to upsert, ids whose store entries must survive). Rows still holding
+    their stored preview are left alone. Apply with commit_notes() only once
+    the CSV carrying those previews has been written.
+    """
+    notes = df["notes"].fillna("").astype(str) if "notes" in df.columns else pd.Series("", index=df.index)
+    ids = pd.to_numeric(df["id"], errors="coerce") if "id" in df.columns else pd.Series(float("nan"), index=df.index)
+    long_mask = (notes.str.len() > PREVIEW_LEN) & ids.notna()
+
+    if not long_mask.any() and not os.path.exists(store_path(csv_path)):
+        return df, {}, set()
+
+    with _connect(csv_path) as conn:
+        stored = dict(conn.execute("SELECT id, preview FROM notes").fetchall())
+    conn.close()
+    stored_preview = ids.map(lambda i: stored.get(int(i)) if pd.notna(i) else None)
+    unchanged = (notes == stored_preview) & stored_preview.notna()
+    changed = long_mask & ~unchanged
+
+    previews = notes[changed].map(make_preview)
+    upserts = {
+        int(rid): (preview, zlib.compress(body.encode("utf-8")))
+        for rid, body, preview in zip(ids[changed], notes[changed], previews)
+    }
+    keep = set(int(i) for i in ids[unchanged | changed])
+
+    if changed.any():
+        df = df.copy()
+        df.loc[changed, "notes"] = previews
+    return df, upserts, keep
+
+def commit_notes(csv_path: str, upserts: dict, keep: set = None):
+    """
+    Write planned bodies to the store; with `keep`, also drop entries for every
+    other id (deleted records or notes that became short).
+    """
+    if not upserts and keep is None:
+        return
+    if not upserts and not os.path.exists(store_path(csv_path)):
+        return
+    with _connect(csv_path) as conn:
+        if upserts:
+            conn.executemany(
+                "INSERT OR REPLACE INTO notes (id, preview, body) VALUES (?, ?, ?)",
+                [(rid, preview, body) for rid, (preview, body) in upserts.items()],
+            )
+        if keep is not None:
+            stored = [row[0] for row in conn.execute("SELECT id FROM notes")]
+            stale = sorted(set(stored) - keep - set(upserts))
+            for chunk in _chunks(stale):
+                marks = ",".join("?" * len(chunk))
+                conn.execute(f"DELETE FROM notes WHERE id IN ({marks})", chunk)
+    conn.close()
@@ -0,0 +1,333 @@
+# modules/query.py
+import re
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.data_handler import parse_dates
+
+
+# Columns searched by free-text terms
+TEXT_COLUMNS = ["title", "category", "link", "notes", "tags", "source"]
+
+FIELD_ALIASES = {
+    "id": "id",
+    "category": "category",
+    "cat": "category",
+    "tag": "tag",
+    "tags": "tag",
+    "added": "added",
+    "date": "added",
+    "source": "source",
+    "title": "title",
+    "link": "link",
+    "notes": "notes",
+}
+
+_TOKEN_RE = re.compile(r'(-?)(?:(\w+):)?(?:"([^"]*)"|(\S+))')
+_WORD_RE = re.compile(r"\w+")
+_EMPTY = np.array([], dtype=np.int64)
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(str(text).lower())
+
+def _text_blob(df: pd.DataFrame) -> pd.Series:
+    """All TEXT_COLUMNS joined with spaces, built column by column (no per-row Python)."""
+    cols = [df[c].fillna("").astype(str) for c in TEXT_COLUMNS]
+    return cols[0].str.cat(cols[1:], sep=" ")
+
+def _group_postings(keys: pd.Series) -> dict:
+    """
+    {key: sorted unique row positions} for a Series whose index holds row
+    positions (one entry per row, or several after explode). NaN keys are dropped.
+    """
+    keys = keys.dropna()
+    if keys.empty:
+        return {}
+    codes, uniques = pd.factorize(keys, sort=False)
+    rows = keys.index.to_numpy(dtype=np.int64)
+    order = np.lexsort((rows, codes))
+    codes, rows = codes[order], rows[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+    codes, rows = codes[first], rows[first]
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    return dict(zip(uniques[np.unique(codes)].tolist(), np.split(rows, bounds)))
+
+
+# -------------- Indexes --------------
+def build_index(df: pd.DataFrame) -> dict:
+    """
+    Build lookup indexes over a vault DataFrame. All postings are sorted arrays
+    of row positions (iloc), so they can be intersected directly.
+    """
+    n = len(df)
+    df = df.reset_index(drop=True)  # index == row position from here on
+
+    by_id = _group_postings(pd.to_numeric(df["id"], errors="coerce"))
+    by_category = _group_postings(df["category"].fillna("").astype(str).str.strip().str.lower())
+
+    tags = df["tags"].fillna("").astype(str).str.lower().str.split(",").explode().str.strip()
+    by_tag = _group_postings(tags[tags != ""])
+
+    dates = parse_dates(df["date_added"]).values
+    valid = ~pd.isna(dates)
+    order = np.argsort(dates[valid], kind="stable")
+    date_values = dates[valid][order]
+    date_pos = np.arange(n, dtype=np.int64)[valid][order]
+
+    words = _text_blob(df).str.lower().str.findall(_WORD_RE.pattern).explode().dropna()
+    text = _group_postings(words)
+
+    return {
+        "n": n,
+        "id": by_id,
+        "category": by_category,
+        "tag": by_tag,
+        "date_values": date_values,
+        "date_pos": date_pos,
+        "text": text,
+        "vocab": sorted(text),
+    }
+
+
+# -------------- Parsing --------------
+def parse_query(query: str) -> list[dict]:
+    """
+    Parse a query such as
+        category:Book tag:sql added:>2025-08 "window functions" -beginner
+    into a list of predicates {"field", "op", "value", "negate"}.
+    Bare words and quoted phrases are free-text predicates.
+    """
+    preds = []
+    for neg, field, quoted, bare in _TOKEN_RE.findall(query or ""):
+        value = quoted if quoted else bare
+        op = "="
+        key = FIELD_ALIASES.get(field.lower()) if field else None
+        if field and key is None:
+            # Unknown field: treat the whole token as text
+            key, value = "text", f"{field}:{value}"
+        elif key is None:
+            key = "text"
+        if key in ("added", "id"):
+            m = re.match(r"^(>=|<=|>|<)(.*)$", value)
+            if m:
+                op, value = m.group(1), m.group(2)
+        value = value.strip()
+        if not value:
+            continue
+        preds.append({"field": key, "op": op, "value": value, "negate": bool(neg)})
+    return preds
+
+
+# -------------- Planning --------------
+def _date_bounds(value: str):
+    """Return (start, end) of the period a date literal names (year, month or day)."""
+    for fmt, freq in (("%Y-%m-%d", "D"), ("%Y-%m", "M"), ("%Y", "Y")):
+        try:
+            period = pd.Period(pd.Timestamp(pd.to_datetime(value, format=fmt)), freq=freq)
+        except (ValueError, TypeError):
+            continue
+        return period.start_time, period.end_time
+    return None
+
+def _date_lookup(index: dict, op: str, value: str):
+    bounds = _date_bounds(value)
+    if bounds is None:
+        return None
+    start, end = (np.datetime64(b) for b in bounds)
+    vals = index["date_values"]
+    lo, hi = 0, len(vals)
+    if op == "=":
+        lo, hi = np.searchsorted(vals, start, "left"), np.searchsorted(vals, end, "right")
+    elif op == ">":
+        lo = np.searchsorted(vals, end, "right")
+    elif op == ">=":
+        lo = np.searchsorted(vals, start, "left")
+    elif op == "<":
+        hi = np.searchsorted(vals, start, "left")
+    elif op == "<=":
+        hi = np.searchsorted(vals, end, "right")
+    return np.sort(index["date_pos"][lo:hi])
+
+def _prefix_lookup(index: dict, word: str) -> np.ndarray:
+    vocab = index["vocab"]
+    i = bisect_left(vocab, word)
+    hits = []
+    while i < len(vocab) and vocab[i].startswith(word):
+        hits.append(index["text"][vocab[i]])
+        i += 1
+    if not hits:
+        return _EMPTY
+    return np.unique(np.concatenate(hits))
+
+def _index_lookup(index: dict, pred: dict):
+    """Row positions for a predicate via an index, or None if no index applies."""
+    field, op, value = pred["field"], pred["op"], pred["value"]
+    if field == "id":
+        try:
+            key = float(value)
+        except ValueError:
+            return _EMPTY
+        if op == "=":
+            return index["id"].get(key, _EMPTY)
+        return None
+    if field == "category":
+        return index["category"].get(value.lower(), _EMPTY)
+    if field == "tag":
+        return index["tag"].get(value.lower(), _EMPTY)
+    if field == "added":
+        return _date_lookup(index, op, value)
+    if field == "text":
+        words = _words(value)
+        if not words:
+            return None
+        result = None
+        for w in words:
+            rows = _prefix_lookup(index, w)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
+    return None
+
+def plan_query(preds: list[dict], index: dict) -> list[dict]:
+    """
+    Order predicates for execution: indexed positive predicates first, most
+    selective (fewest rows) first; then indexed negations; then masks that
+    need a scan of the surviving rows.
+    """
+    steps = []
+    for pred in preds:
+        rows = _index_lookup(index, pred)
+        # A single word is answered by the index (word-prefix match); phrases are
+        # narrowed by the index, then verified by a substring scan of the candidates.
+        verify = pred["field"] == "text" and _words(pred["value"]) != [pred["value"].lower()]
+        steps.append({
+            "pred": pred,
+            "rows": rows,
+            "method": "index" if rows is not None else "scan",
+            "estimate": len(rows) if rows is not None else index["n"],
+            "verify": verify,
+        })
+
+    def rank(step):
+        indexed = step["rows"] is not None
+        if indexed and not step["pred"]["negate"]:
+            return (0, step["estimate"])
+        if indexed:
+            return (1, 0)
+        return (2, 0)
+
+    return sorted(steps, key=rank)
+
+
+# -------------- Execution --------------
+def _scan_mask(df: pd.DataFrame, pred: dict) -> pd.Series:
+    field, op, value = pred["field"], pred["op"], pred["value"]
+    if field == "text":
+        blob = _text_blob(df)
+        return blob.str.contains(value, case=False, regex=False)
+    if field == "id":
+        ids = pd.to_numeric(df["id"], errors="coerce")
+        try:
+            v = float(value)
+        except ValueError:
+            return pd.Series(False, index=df.index)
+        return {">": ids > v, ">=": ids >= v, "<": ids < v, "<=": ids <= v}.get(op, ids == v)
+    if field == "added":
+        # Unparseable date literal: nothing matches
+        return pd.Series(False, index=df.index)
+    return df[field].fillna("").astype(str).str.contains(value, case=False, regex=False)
+
+def _describe(pred: dict) -> str:
+    op = "" if pred["op"] == "=" else pred["op"]
+    text = f'"{pred["value"]}"' if pred["field"] == "text" else f'{pred["field"]}:{op}{pred["value"]}'
+    return ("-" if pred["negate"] else "") + text
+
+def run_query(df: pd.DataFrame, query: str, index: dict | None = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Parse, plan and execute `query` against `df`.
+    Returns (matching rows, report) where report lists each plan step with the
+    method used (index/scan), its estimated rows, rows remaining after it, and timings.
+    """
+    t0 = time.perf_counter()
+    if index is None:
+        index = build_index(df)
+    preds = parse_query(query)
+    plan = plan_query(preds, index)
+    t_plan = time.perf_counter()
+
+    cand = np.arange(len(df), dtype=np.int64)
+    report_steps = []
+    for step in plan:
+        pred = step["pred"]
+        if step["rows"] is not None:
+            if pred["negate"] and not step["verify"]:
+                cand = np.setdiff1d(cand, step["rows"], assume_unique=True)
+            elif not pred["negate"]:
+                cand = np.intersect1d(cand, step["rows"], assume_unique=True)
+        if step["verify"] or step["rows"] is None:
+            if len(cand):
+                mask = _scan_mask(df.iloc[cand], pred).to_numpy(dtype=bool)
+                cand = cand[~mask] if pred["negate"] else cand[mask]
+        report_steps.append({
+            "predicate": _describe(pred),
+            "method": step["method"] + ("+verify" if step["verify"] and step["rows"] is not None else ""),
+            "estimate": step["estimate"],
+            "rows_after": len(cand),
+        })
+        if len(cand) == 0:
+            break
+
+    result = df.iloc[cand]
+    t_end = time.perf_counter()
+    report = {
+        "query": query,
+        "steps": report_steps,
+        "rows": len(result),
+        "plan_ms": (t_plan - t0) * 1000,
+        "exec_ms": (t_end - t_plan) * 1000,
+        "total_ms": (t_end - t0) * 1000,
+    }
+    return result, report
+
+def run_query_shards(shards: dict, query: str, indexes: dict | None = None, workers: int | None = None) -> tuple[pd.DataFrame, dict]:
+    """
+    Run `query` on every shard ({name: frame}) in parallel and merge the matches.
+    `indexes` maps shard name to a prebuilt index. The report's steps are tagged
+    with their shard; plan/exec times are summed over shards, total_ms is wall-clock.
+    """
+    t0 = time.perf_counter()
+    indexes = indexes or {}
+    names = [name for name, part in shards.items() if not part.empty]
+    if not names:
+        empty = next(iter(shards.values()), pd.DataFrame())
+        return empty, {"query": query, "steps": [], "rows": 0, "plan_ms": 0.0, "exec_ms": 0.0, "total_ms": 0.0}
+    if len(names) == 1:
+        return run_query(shards[names[0]], query, indexes.get(names[0]))
+
+    def one(name):
+        return run_query(shards[name], query, indexes.get(name))
+
+    with ThreadPoolExecutor(max_workers=workers or min(8, len(names))) as pool:
+        results = list(pool.map(one, names))
+
+    steps = []
+    for name, (_, rep) in zip(names, results):
+        steps += [{"shard": name or "(main)", **step} for step in rep["steps"]]
+    frames = [res for res, _ in results if not res.empty]
+    merged = pd.concat(frames) if frames else shards[names[0]].iloc[0:0]
+    report = {
+        "query": query,
+        "steps": steps,
+        "rows": len(merged),
+        "plan_ms": sum(rep["plan_ms"] for _, rep in results),
+        "exec_ms": sum(rep["exec_ms"] for _, rep in results),
+        "total_ms": (time.perf_counter() - t0) * 1000,
+    }
+    return merged, report
@@ -0,0 +1,204 @@
+# modules/refresh_worker.py
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from modules.data_handler import DATA_DIR, CSV_PATH, add_records, load_vault, save_vault, vault_lock
+from modules.fetchers import fetch_books, fetch_youtube
+
+
+TOPICS_PATH = os.path.join(DATA_DIR, "watched_topics.json")
+
+DEFAULT_INTERVAL_MIN = 60
+QUEUE_SIZE = 16      # bounded: the scheduler blocks until fetch threads catch up
+FETCH_THREADS = 4
+
+_workers = []        # started workers, woken when the interval changes
+
+
+# -------------- Watched topics --------------
+def load_topics(path: str = TOPICS_PATH) -> dict:
+    """Read {"interval_minutes": int, "topics": [{"topic", "count", "books", "youtube"}]}."""
+    config = {"interval_minutes": DEFAULT_INTERVAL_MIN, "topics": []}
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                config.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read {path}: {e}")
+    return config
+
+def save_topics(config: dict, path: str = TOPICS_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+def add_topic(topic: str, count: int = 6, books: bool = True, youtube: bool = True, path: str = TOPICS_PATH) -> bool:
+    """Watch a topic (case-insensitive). Returns False if it is already watched."""
+    topic = (topic or "").strip()
+    config = load_topics(path)
+    if not topic or any(t["topic"].lower() == topic.lower() for t in config["topics"]):
+        return False
+    config["topics"].append({"topic": topic, "count": int(count), "books": bool(books), "youtube": bool(youtube)})
+    save_topics(config, path)
+    return True
+
+def remove_topic(topic: str, path: str = TOPICS_PATH):
+    config = load_topics(path)
+    config["topics"] = [t for t in config["topics"] if t["topic"].lower() != (topic or "").strip().lower()]
+    save_topics(config, path)
+
+def set_interval(minutes: int, path: str = TOPICS_PATH):
+    """Save the new interval and let running workers reschedule against it."""
+    config = load_topics(path)
+    config["interval_minutes"] = max(1, int(minutes))
+    save_topics(config, path)
+    for worker in list(_workers):
+        if worker.topics_path == path:
+            worker.reschedule()
+
+
+# -------------- Worker --------------
+class RefreshWorker:
+    """
+    Refreshes watched topics every `interval_minutes` on background threads.
+    A scheduler thread queues the topics (bounded queue), a few fetch threads
+    drain it, and each cycle is deduped against the vault and saved in one write.
+    """
+
+    def __init__(self, csv_path: str = CSV_PATH, topics_path: str = TOPICS_PATH, youtube_key: str = None):
+        self.csv_path = csv_path
+        self.topics_path = topics_path
+        self.youtube_key = youtube_key
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._wake = threading.Event()
+        self._run_requested = False
+        self._lock = threading.Lock()
+        self._results = {}
+        self.stats = {
+            "running": False,
+            "last_run": None,
+            "last_latency_s": None,
+            "last_added": 0,
+            "per_topic": {},
+            "errors": [],
+        }
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return self
+        for i in range(FETCH_THREADS):
+            t = threading.Thread(target=self._fetch_loop, name=f"kv-fetch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._schedule_loop, name="kv-refresh", daemon=True)
+        t.start()
+        self._threads.append(t)
+        _workers.append(self)
+        return self
+
+    def run_now(self):
+        """Start a cycle without waiting for the interval."""
+        with self._lock:
+            self._run_requested = True
+        self._wake.set()
+
+    def reschedule(self):
+        """Re-read the interval now; the next cycle is due `interval` after the last one started."""
+        self._wake.set()
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "per_topic": dict(self.stats["per_topic"]), "queue_depth": self.queue_depth()}
+
+    # ---- threads ----
+    def _schedule_loop(self):
+        last_start = None    # first cycle runs as soon as the worker starts
+        while True:
+            interval = load_topics(self.topics_path)["interval_minutes"] * 60
+            due_in = 0 if last_start is None else max(0, last_start + interval - time.monotonic())
+            if self._wake.wait(timeout=due_in):
+                self._wake.clear()
+                with self._lock:
+                    run, self._run_requested = self._run_requested, False
+                if not run:
+                    continue
+            last_start = time.monotonic()
+            try:
+                self.run_cycle()
+            except Exception as e:
+                self._record_error(f"refresh cycle failed: {e}")
+                with self._lock:
+                    self.stats["running"] = False
+
+    def _fetch_loop(self):
+        while True:
+            entry = self.queue.get()
+            try:
+                topic = entry["topic"]
+                count = int(entry.get("count", 6))
+                on_error = lambda e, t=topic: self._record_error(f"{t}: {e}")
+                items = []
+                if entry.get("books", True):
+                    items += fetch_books(topic, count, on_error=on_error)
+                if entry.get("youtube", True) and self.youtube_key:
+                    items += fetch_youtube(topic, count, key=self.youtube_key, on_error=on_error)
+                with self._lock:
+                    self._results[topic] = items
+            except Exception as e:
+                self._record_error(f"{entry.get('topic')}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _record_error(self, message: str):
+        with self._lock:
+            self.stats["errors"] = (self.stats["errors"] + [f"{datetime.now():%H:%M:%S} {message}"])[-10:]
+
+    # ---- one cycle ----
+    def run_cycle(self):
+        topics = load_topics(self.topics_path)["topics"]
+        if not topics:
+            return
+        t0 = time.perf_counter()
+        with self._lock:
+            self.stats["running"] = True
+            self._results = {}
+
+        for entry in topics:
+            self.queue.put(entry)
+        self.queue.join()
+
+        with self._lock:
+            results = dict(self._results)
+
+        # Dedupe per topic in memory, then one write for the whole cycle.
+        # Load and save under the vault lock so app edits in between are kept.
+        with vault_lock():
+            base = load_vault(self.csv_path)
+            df = base
+            per_topic = {}
+            for topic, items in results.items():
+                df, added, dupes = add_records(df, items)
+                per_topic[topic] = {"fetched": len(items), "added": added, "duplicates": dupes,
+                                    "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+            total = sum(p["added"] for p in per_topic.values())
+            if total:
+                save_vault(df, self.csv_path, base=base)
+
+        with self._lock:
+            self.stats.update({
+                "running": False,
+                "last_run": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "last_latency_s": time.perf_counter() - t0,
+                "last_added": total,
+            })
+            self.stats["per_topic"].update(per_topic)
@@ -0,0 +1,159 @@
+# modules/title_index.py
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+import pandas as pd
+
+
+# A sync touching more rows than this fraction of the vault rebuilds instead
+# (restores, Reassign IDs, Clear All).
+REBUILD_RATIO = 0.25
+
+
+def normalize_title(text) -> str:
+    """Lowercase, strip accents and collapse punctuation to single spaces."""
+    text = unicodedata.normalize("NFKD", "" if pd.isna(text) else str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(re.findall(r"\w+", text))
+
+def _title_keys(title) -> list[str]:
+    """Every word-start suffix of the normalized title ("learn sql" finds "Fastest Way To Learn SQL")."""
+    norm = normalize_title(title)
+    return [norm[m.start():] for m in re.finditer(r"\w+", norm)]
+
+def _id_titles(df: pd.DataFrame) -> dict:
+    ids = pd.to_numeric(df["id"], errors="coerce")
+    valid = ids.notna()
+    titles = df.loc[valid, "title"].fillna("").astype(str)
+    return dict(zip(ids[valid].astype("int64").tolist(), titles.tolist()))
+
+
+# -------------- Build --------------
+def new_title_index() -> dict:
+    """
+    Empty type-ahead index. `entries` and `id_entries` are sorted (key, id)
+    lists, `ids` is sorted ascending and `titles` holds what each id was
+    indexed under, so rows can be removed again by (key, id).
+    """
+    return {
+        "entries": [],
+        "id_entries": [],
+        "ids": [],
+        "titles": {},
+        "labels": {},
+        "version": None,
+        "lock": threading.Lock(),
+    }
+
+def build_title_index(df: pd.DataFrame, version=None) -> dict:
+    """Full build over titles and ids (one sort, no per-row insorts)."""
+    index = new_title_index()
+    titles = _id_titles(df)
+    index["entries"] = sorted((key, rid) for rid, title in titles.items() for key in _title_keys(title))
+    index["id_entries"] = sorted((str(rid), rid) for rid in titles)
+    index["ids"] = sorted(titles)
+    index["titles"] = titles
+    index["labels"] = {rid: f"{rid} — {title}" for rid, title in titles.items()}
+    index["version"] = version
+    return index
+
+
+# -------------- Incremental updates --------------
+def _remove(items: list, item):
+    i = bisect_left(items, item)
+    if i < len(items) and items[i] == item:
+        del items[i]
+
+def index_add(index: dict, rid: int, title):
+    """Index one record (call index_remove first if the id is already indexed)."""
+    for key in _title_keys(title):
+        insort(index["entries"], (key, rid))
+    insort(index["id_entries"], (str(rid), rid))
+    insort(index["ids"], rid)
+    index["titles"][rid] = title
+    index["labels"][rid] = f"{rid} — {title}"
+
+def index_remove(index: dict, rid: int):
+    """Drop one record by (key, id); unknown ids are ignored."""
+    if rid not in index["titles"]:
+        return
+    for key in _title_keys(index["titles"].pop(rid)):
+        _remove(index["entries"], (key, rid))
+    _remove(index["id_entries"], (str(rid), rid))
+    _remove(index["ids"], rid)
+    index["labels"].pop(rid, None)
+
+def index_update(index: dict, rid: int, title):
+    if index["titles"].get(rid) != title:
+        index_remove(index, rid)
+        index_add(index, rid, title)
+
+def sync_title_index(index: dict, df: pd.DataFrame, version=None) -> dict:
+    """
+    Bring `index` in step with `df`: rows added, retitled or deleted since the
+    last sync are applied one by one. Large changes fall back to a full build,
+    which is copied into `index` so callers can keep holding the same dict.
+    """
+    with index["lock"]:
+        if version is not None and index["version"] == version:
+            return index
+        current = _id_titles(df)
+        old = index["titles"]
+        removed = old.keys() - current.keys()
+        changed = [(rid, title) for rid, title in current.items() if rid not in old or old[rid] != title]
+
+        if len(removed) + len(changed) > max(1, len(current)) * REBUILD_RATIO:
+            fresh = build_title_index(df, version)
+            fresh.pop("lock")
+            index.update(fresh)
+            return index
+
+        for rid in removed:
+            index_remove(index, rid)
+        for rid, title in changed:
+            index_update(index, rid, title)
+        index["version"] = version
+        return index
+
+
+# -------------- Lookup --------------
+def _prefix_range(items: list, prefix: str):
+    lo = bisect_left(items, (prefix,))
+    hi = bisect_left(items, (prefix + "\U0010ffff",))
+    return lo, hi
+
+def title_lookup(index: dict, text: str, limit: int = 20) -> list[tuple]:
+    """
+    Top `limit` (id, "id — title") matches for a typed prefix: id matches first,
+    then titles with a word starting with the text. Empty text returns the newest ids.
+    """
+    with index["lock"]:
+        labels = index["labels"]
+        text = (text or "").strip()
+        if not text:
+            newest = index["ids"][-limit:] if limit > 0 else []
+            return [(rid, labels[rid]) for rid in reversed(newest)]
+
+        out, seen = [], set()
+        if text.isdigit():
+            lo, hi = _prefix_range(index["id_entries"], text)
+            for i in range(lo, hi):
+                rid = index["id_entries"][i][1]
+                if len(out) >= limit:
+                    break
+                seen.add(rid)
+                out.append((rid, labels[rid]))
+
+        norm = normalize_title(text)
+        if norm:
+            lo, hi = _prefix_range(index["entries"], norm)
+            for i in range(lo, hi):
+                rid = index["entries"][i][1]
+                if len(out) >= limit:
+                    break
+                if rid not in seen:
+                    seen.add(rid)
+                    out.append((rid, labels[rid]))
+        return out
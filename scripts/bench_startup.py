@@ -0,0 +1,84 @@
+# scripts/bench_startup.py
+"""
+Startup and rerun timings for the app, as quoted in the lazy-import change.
+
+    python scripts/bench_startup.py            # from the repo root
+    python scripts/bench_startup.py /path/to/other/checkout
+
+Prints, for the given checkout:
+- the extra import time of the heavy optional modules on top of pandas +
+  streamlit (median of 7 fresh processes), and
+- AppTest script-run times on its data/ vault: first run and median of 10
+  reruns, plus which of those modules the default view loaded.
+To compare two commits, run it on a `git worktree` of each.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY = ["matplotlib.pyplot", "requests", "xlsxwriter"]
+IMPORT_RUNS = 7
+RERUNS = 10
+
+_IMPORT_SNIPPET = r"""
+import json, sys, time
+t = time.perf_counter(); import pandas, streamlit
+out = {"pandas+streamlit": time.perf_counter() - t}
+for mod in %r:
+    t = time.perf_counter()
+    try:
+        __import__(mod)
+    except ImportError:
+        out[mod] = None
+        continue
+    out[mod] = time.perf_counter() - t
+print(json.dumps(out))
+""" % (HEAVY,)
+
+_APPTEST_SNIPPET = r"""
+import json, statistics, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(%r, default_timeout=120)
+t = time.perf_counter(); at.run(); first = time.perf_counter() - t
+if at.exception:
+    raise SystemExit(f"app raised: {at.exception[0].message}")
+times = []
+for _ in range(%d):
+    t = time.perf_counter(); at.run(); times.append(time.perf_counter() - t)
+print(json.dumps({"first": first, "rerun": statistics.median(times),
+                  "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def import_costs() -> dict:
+    runs = []
+    for _ in range(IMPORT_RUNS):
+        out = subprocess.run([sys.executable, "-c", _IMPORT_SNIPPET], capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout))
+    return {
+        key: (statistics.median(r[key] for r in runs) if runs[0][key] is not None else None)
+        for key in runs[0]
+    }
+
+def app_timings(root: str) -> dict:
+    snippet = _APPTEST_SNIPPET % (os.path.join(root, "app.py"), RERUNS, HEAVY)
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, cwd=root)
+    if out.returncode:
+        raise SystemExit(out.stderr.strip().splitlines()[-1])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    root = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else os.getcwd())
+    costs = import_costs()
+    print(f"pandas + streamlit: {costs.pop('pandas+streamlit') * 1000:.0f} ms")
+    for mod, secs in costs.items():
+        print(f"  + {mod}: " + (f"{secs * 1000:.0f} ms" if secs is not None else "not installed"))
+
+    timings = app_timings(root)
+    print(f"{root}: first run {timings['first'] * 1000:.0f} ms, "
+          f"rerun {timings['rerun'] * 1000:.0f} ms (median of {RERUNS}), "
+          f"loaded: {', '.join(timings['loaded']) or 'none of ' + ', '.join(HEAVY)}")